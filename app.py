@@ -8,23 +8,45 @@ import os
 import json
 import io
 import re
-from werkzeug.utils import secure_filename
+import threading
+from collections import namedtuple
+from functools import lru_cache
+from operator import itemgetter
 from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
 import gunicorn
 
+# Optional: event-stream JSON parsing for constant-memory conversion
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional: fast C parser for the full-tree fallback path. orjson only
+# handles 64-bit integers: versions that raise on wider ints are fine
+# (the parse site retries with the stdlib, as it does for the NaN and
+# Infinity literals orjson rejects), but old versions silently parse
+# them as lossy floats - probe for that and disable orjson outright
+# rather than corrupt valid documents.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+else:
+    try:
+        if isinstance(orjson.loads(b'[18446744073709551616]')[0], float):
+            orjson = None
+    except orjson.JSONDecodeError:
+        pass
+
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
-app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['ALLOWED_EXTENSIONS'] = {'json'}
 
-# Create uploads directory if it doesn't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
 
 def allowed_file(filename):
     """Check if the file extension is allowed."""
@@ -32,292 +54,793 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 
+# Characters dropped from download names; everything else is kept as-is.
+_FILENAME_SANITIZE_SUB = re.compile(r'[^A-Za-z0-9._-]+').sub
+
+
+def _toon_download_name(filename):
+    """
+    Build the '<base>.toon' download name for an upload in one pass.
+
+    The name only labels the browser download - nothing touches the
+    filesystem - so a single character-class substitution plus one
+    rpartition replaces the secure_filename + splitext + concat chain.
+    """
+    safe = _FILENAME_SANITIZE_SUB('_', filename).strip('._')
+    base, dot, _ = safe.rpartition('.')
+    if not dot:
+        base = safe
+    return (base or 'converted') + '.toon'
+
+
+# Cache of indent prefixes so the hot path never re-allocates '  ' * indent.
+# The emitter works in already-encoded UTF-8 fragments end to end, so the
+# finished buffer goes straight into the download response with no full-size
+# str intermediate and no trailing .encode() pass.
+_INDENTS = tuple(('  ' * i).encode() for i in range(128))
+
+# Scalar types that may appear inline or as tabular cells.
+_SIMPLE_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+# Characters that force a tabular cell to be quoted; a single C-level regex
+# scan replaces the pair of substring searches per cell. Bound .search saves
+# an attribute lookup per call.
+_CELL_SPECIAL_SEARCH = re.compile(r'[|\n]').search
+
+
+def _fmt_cell_str(val):
+    # Escape special characters
+    if _CELL_SPECIAL_SEARCH(val):
+        return f'"{val}"'.encode('utf-8')
+    return val.encode('utf-8')
+
+
+def _fmt_num(val):
+    return str(val).encode()
+
+
+def _fmt_int(val):
+    # One C-level format call; skips the str() boxing and .encode() pass.
+    # Ints only - floats must keep str()'s shortest-repr output.
+    return b'%d' % val
+
+
+# type -> formatter for tabular cells (quoting rules differ from format_value).
+_CELL_FMT = {
+    type(None): lambda val: b'null',
+    bool: lambda val: b'true' if val else b'false',
+    int: _fmt_int,
+    float: _fmt_num,
+    str: _fmt_cell_str,
+}
+
+
+# int and float cells format as plain str(), so whole rows of them can go
+# through one %-format instead of per-cell dispatch. bool is deliberately
+# excluded: it needs lowercasing.
+_NUMERIC_TYPES = frozenset({int, float})
+
+
+def _emit_numeric_table(value, keys, row_indent, out):
+    """
+    Fast row loop for tables whose first row is all int/float columns.
+
+    Each row costs one itemgetter fetch, one type-set subset test and one
+    %-format - all C level - instead of a Python loop over cells. Returns
+    False (with the rows rolled back) on the first row that is missing a
+    key, has extra keys, or holds a non-numeric value, so the caller can
+    rerun the generic per-cell loop.
+    """
+    checkpoint = len(out)
+    ncols = len(keys)
+    get = itemgetter(*keys)
+    # bytes %-formatting has no str()-equivalent for floats, so rows are
+    # %-formatted as str and encoded in one go; numeric output is ASCII.
+    row_fmt = ' | '.join(['%s'] * ncols)
+    try:
+        for item in value:
+            if type(item) is not dict or len(item) != ncols:
+                del out[checkpoint:]
+                return False
+            vals = get(item)
+            if ncols == 1:
+                vals = (vals,)
+            if not set(map(type, vals)).issubset(_NUMERIC_TYPES):
+                del out[checkpoint:]
+                return False
+            out += row_indent
+            out += (row_fmt % vals).encode()
+            out += b'\n'
+    except KeyError:
+        del out[checkpoint:]
+        return False
+    return True
+
+
+def _try_emit_table(value, row_indent, out):
+    """
+    Emit a non-empty list of flat dicts as a CSV-style table in one pass.
+
+    Rows are written optimistically while checking each item; on the first
+    item that is not a flat dict of simple values, the buffer is truncated
+    back to its starting length and False is returned so the caller can
+    fall through to the regular emission path. This avoids walking the
+    whole array once to decide and a second time to emit.
+
+    Column formatters are picked once from the first row's types, so the
+    common homogeneous table costs one dict lookup per cell instead of an
+    isinstance cascade; heterogeneous columns fall back per cell. Rows
+    whose keys() view equals the first row's skip the per-value scan
+    entirely - the usual case for serializer-produced JSON.
+    """
+    checkpoint = len(out)
+    first = value[0]
+    if type(first) is not dict or not first:
+        return False
+    if any(type(v) not in _SIMPLE_TYPES for v in first.values()):
+        return False
+
+    keys = list(first)
+    first_keys = first.keys()
+    col_types = [type(first[k]) for k in keys]
+    col_fmt = [_CELL_FMT[t] for t in col_types]
+    sep = b' | '
+
+    # Header row
+    out += row_indent
+    out += sep.join(str(k).encode('utf-8') for k in keys)
+    out += b'\n'
+    # Data rows: all-numeric tables take the specialized row loop; any
+    # deviation rolls its rows back and falls through to the generic one.
+    if _NUMERIC_TYPES.issuperset(col_types) and _emit_numeric_table(value, keys, row_indent, out):
+        return True
+    for item in value:
+        if type(item) is dict and item.keys() == first_keys:
+            # Same schema as row 0 (dict_keys views compare in C with set
+            # semantics): index by key directly and skip the per-value
+            # simple-type scan - a non-simple cell has no _CELL_FMT entry
+            # and surfaces as the KeyError handled below.
+            try:
+                row_values = []
+                for j, k in enumerate(keys):
+                    val = item[k]
+                    if type(val) is col_types[j]:
+                        row_values.append(col_fmt[j](val))
+                    else:
+                        row_values.append(_CELL_FMT[type(val)](val))
+            except KeyError:
+                del out[checkpoint:]
+                return False
+        else:
+            if type(item) is not dict or not item:
+                del out[checkpoint:]
+                return False
+            for v in item.values():
+                if type(v) not in _SIMPLE_TYPES:
+                    del out[checkpoint:]
+                    return False
+            row_values = []
+            for j, k in enumerate(keys):
+                val = item.get(k, '')
+                if type(val) is col_types[j]:
+                    row_values.append(col_fmt[j](val))
+                else:
+                    row_values.append(_CELL_FMT[type(val)](val))
+        out += row_indent
+        out += sep.join(row_values)
+        out += b'\n'
+    return True
+
+
+# Structural facts recorded while emitting, so verification does not need to
+# re-parse the output: the number of top-level object keys emitted.
+EmitStats = namedtuple('EmitStats', ['top_keys'])
+
+
+# Per-thread emission buffer, reused across requests so steady-state traffic
+# does not churn MB-sized allocations. Safe to hand out because everything
+# downstream (BytesIO, .decode) copies the contents before the same thread
+# can serve another request. Buffers grown by outlier documents are dropped
+# rather than pinned forever.
+_tls = threading.local()
+_BUF_REUSE_CAP = 4 * 1024 * 1024
+
+
+def _acquire_buf():
+    """Return this thread's cleared emission buffer, allocating on first use
+    or when the previous request left it oversized."""
+    buf = getattr(_tls, 'buf', None)
+    if buf is None or len(buf) > _BUF_REUSE_CAP:
+        buf = bytearray()
+        _tls.buf = buf
+    else:
+        del buf[:]
+    return buf
+
+
+# A bespoke emitter is only compiled once its shape has been seen before:
+# codegen plus compile() cost scales with key count and is pure waste for
+# one-off schemas (any ID-keyed map makes a unique shape per document),
+# which are the norm for ad-hoc uploads. Sightings are tracked by shape
+# hash so the big shape tuples themselves are never pinned, and the set is
+# cleared when full rather than grown without bound. Objects over the key
+# cap always take the generic emitter - codegen for them costs more than
+# it could ever amortize.
+_COMPILE_MAX_KEYS = 256
+_SEEN_SHAPES_CAP = 4096
+_seen_shapes = set()
+
+
+def _convert(data):
+    """
+    Emit `data` as UTF-8 TOON into this thread's reused buffer (trailing
+    newline kept). Callers must copy or consume the buffer before the
+    thread converts again.
+
+    Top-level objects whose shape has recurred are routed through a
+    per-shape compiled emitter (see _compile_emitter); first sightings
+    and everything else go through the generic emitter.
+
+    Returns:
+        tuple: (buffer: bytearray, stats: EmitStats)
+    """
+    buf = _acquire_buf()
+    if type(data) is dict and 0 < len(data) <= _COMPILE_MAX_KEYS:
+        try:
+            shape = _shape(data)
+        except RecursionError:
+            shape = None  # absurdly deep document; the generic emitter copes
+        if shape is not None:
+            shape_hash = hash(shape)
+            if shape_hash in _seen_shapes:
+                emit = _compile_emitter(shape)
+                if emit is not None:
+                    emit(data, buf)
+                    return buf, EmitStats(len(data))
+            else:
+                if len(_seen_shapes) >= _SEEN_SHAPES_CAP:
+                    _seen_shapes.clear()
+                _seen_shapes.add(shape_hash)
+    stats = _emit(data, 0, buf)
+    return buf, stats
+
+
+def json_to_toon_bytes(data):
+    """
+    Convert JSON data straight to UTF-8 TOON bytes.
+
+    This is the path the download response uses: fragments are encoded as
+    they are appended, so there is no document-sized str to build and then
+    re-encode.
+
+    Args:
+        data: JSON data (dict, list, or primitive)
+
+    Returns:
+        bytes: UTF-8 encoded TOON document
+    """
+    buf, _ = _convert(data)
+    # Every emitted line ends with '\n'; drop the trailing one in place
+    # rather than slicing a full-size copy.
+    del buf[-1:]
+    return bytes(buf)
+
+
 def json_to_toon(data, indent=0):
     """
     Convert JSON data to TOON format.
     TOON combines YAML-style indentation for objects with CSV-style tables for arrays.
-    
+
     Args:
         data: JSON data (dict, list, or primitive)
         indent: Current indentation level
-    
+
     Returns:
         str: TOON formatted string
     """
+    if indent == 0:
+        buf, _ = _convert(data)
+    else:
+        buf = bytearray()
+        _emit(data, indent, buf)
+    # Every emitted line ends with '\n'; drop the trailing one in place
+    # and decode the buffer directly instead of slicing a copy first.
+    del buf[-1:]
+    return buf.decode('utf-8')
+
+
+def _shape(obj):
+    """
+    Canonical, hashable signature of a JSON document's structure.
+
+    Dicts map to their (key, child-shape) pairs, lists collapse to their
+    element shape when homogeneous (or None when mixed), scalars map to
+    their type. Two documents with equal shapes format identically, which
+    is what lets one compiled emitter be reused across them.
+    """
+    t = type(obj)
+    if t is dict:
+        return (dict, tuple((k, _shape(v)) for k, v in obj.items()))
+    if t is list:
+        if not obj:
+            return (list, ())
+        it = iter(obj)
+        elem = _shape(next(it))
+        for item in it:
+            if _shape(item) != elem:
+                return (list, None)
+        return (list, elem)
+    return t
+
+
+# Source expression per scalar shape; {v} is the value access expression.
+# All expressions evaluate to bytes, matching the bytearray output buffer.
+_SCALAR_EXPRS = {
+    bool: "(b'true' if {v} else b'false')",
+    int: '_fmt_int({v})',
+    float: '_fmt_num({v})',
+    str: '_fmt_str({v})',
+}
+_CELL_EXPRS = {
+    bool: "(b'true' if {v} else b'false')",
+    int: '_fmt_int({v})',
+    float: '_fmt_num({v})',
+    str: '_fmt_cell_str({v})',
+}
+_SCALAR_SHAPES = (bool, int, float, str, type(None))
+
+
+def _gen_object(entries, var, indent, depth, names, lines):
+    """Append source lines that emit a dict of the given entry shapes."""
+    pad = '    ' * depth
     indent_str = '  ' * indent
-    
-    if isinstance(data, dict):
-        if not data:
-            return '{}'
-        
-        lines = []
-        for key, value in data.items():
+    for key, vshape in entries:
+        # Escape key if needed
+        key_str = str(key)
+        if ' ' in key_str or ':' in key_str or '\n' in key_str:
+            key_str = f'"{key_str}"'
+        item = f'{var}[{key!r}]'
+
+        if vshape is type(None):
+            lines.append(pad + 'out += %r' % (indent_str + key_str + ': null\n').encode('utf-8'))
+        elif vshape in _SCALAR_EXPRS:
+            expr = _SCALAR_EXPRS[vshape].format(v=item)
+            lines.append(pad + 'out += %r + %s + %r'
+                         % ((indent_str + key_str + ': ').encode('utf-8'), expr, b'\n'))
+        elif vshape == (dict, ()):
+            lines.append(pad + 'out += %r' % (indent_str + key_str + ': {}\n').encode('utf-8'))
+        elif vshape == (list, ()):
+            lines.append(pad + 'out += %r' % (indent_str + key_str + ': []\n').encode('utf-8'))
+        elif vshape[0] is dict:
+            # Nested object: bind it to a local and inline its entries.
+            tmp = 'v%d' % next(names)
+            lines.append(pad + 'out += %r' % (indent_str + key_str + ':\n').encode('utf-8'))
+            lines.append(pad + '%s = %s' % (tmp, item))
+            _gen_object(vshape[1], tmp, indent + 1, depth, names, lines)
+        else:
+            elem = vshape[1]
+            lines.append(pad + 'out += %r' % (indent_str + key_str + ':\n').encode('utf-8'))
+            if elem in _SCALAR_SHAPES:
+                # Homogeneous scalar list: inline array on its own line.
+                if elem is type(None):
+                    joined = "b', '.join([b'null'] * len(%s))" % item
+                elif elem is str:
+                    joined = "b', '.join(map(_fmt_str, %s))" % item
+                elif elem is bool:
+                    joined = "b', '.join(b'true' if x else b'false' for x in %s)" % item
+                elif elem is int:
+                    joined = "b', '.join(map(_fmt_int, %s))" % item
+                else:
+                    joined = "b', '.join(map(_fmt_num, %s))" % item
+                lines.append(pad + "out += b'[' + %s + %r" % (joined, b']\n'))
+            elif (type(elem) is tuple and elem[0] is dict and elem[1]
+                  and all(t in _SCALAR_SHAPES for _, t in elem[1])):
+                # Homogeneous table: header is a constant, rows are one
+                # concatenation of per-column expressions each.
+                row_pre = indent_str + '  '
+                keys = [k for k, _ in elem[1]]
+                header = row_pre + ' | '.join(str(k) for k in keys) + '\n'
+                row = 'r%d' % next(names)
+                parts = []
+                for col_key, col_shape in elem[1]:
+                    if col_shape is type(None):
+                        parts.append("b'null'")
+                    else:
+                        parts.append(_CELL_EXPRS[col_shape].format(v='%s[%r]' % (row, col_key)))
+                row_expr = " + b' | ' + ".join(parts)
+                lines.append(pad + 'out += %r' % header.encode('utf-8'))
+                lines.append(pad + 'for %s in %s:' % (row, item))
+                lines.append(pad + '    out += %r + %s + %r' % (row_pre.encode('utf-8'), row_expr, b'\n'))
+            else:
+                # Mixed or deeply nested list: generic emitter handles it,
+                # including heterogeneous tables and '-' item re-indenting.
+                lines.append(pad + '_emit(%s, %d, out)' % (item, indent + 1))
+
+
+@lru_cache(maxsize=64)
+def _compile_emitter(shape):
+    """
+    Build (and memoize) a bespoke emitter for one document shape.
+
+    The generated function writes the document with all keys, indent
+    prefixes, table headers and per-column formatters resolved at compile
+    time - no isinstance dispatch or tabular detection at run time. Only
+    non-empty top-level objects are compiled; returns None for shapes the
+    generic emitter should keep handling.
+    """
+    if shape[0] is not dict or not shape[1]:
+        return None
+    lines = ['def _specialized(d, out):']
+    _gen_object(shape[1], 'd', 0, 1, iter(range(1000000)), lines)
+    namespace = {}
+    exec(compile('\n'.join(lines), '<toon-emitter>', 'exec'), globals(), namespace)
+    return namespace['_specialized']
+
+
+def json_stream_to_toon(stream):
+    """
+    Convert a JSON byte stream to TOON.
+
+    When ijson is available and the document is a top-level object, each
+    key's value is parsed and emitted one at a time, so peak memory is
+    bounded by the largest single value instead of the parsed tree plus
+    the output string for the whole document. Other document shapes (and
+    installs without ijson) fall back to loading the full tree.
+
+    Args:
+        stream: A binary file-like object positioned at the start of the
+            JSON document. Must be seekable.
+
+    Returns:
+        tuple: (toon_data: bytes-like, json_data, stats: EmitStats) where
+        toon_data is the emitter's own buffer (BytesIO and .decode consume
+        it without a full-size bytes copy first), and
+        json_data is the parsed document on the fallback path, or a
+        key-skeleton dict (values are None) on the streaming path -
+        enough for roundtrip verification.
+    """
+    head = stream.read(1)
+    while head.isspace():
+        head = stream.read(1)
+    stream.seek(0)
+
+    if ijson is not None and head == b'{':
+        buf = _acquire_buf()
+        keys = []
+        try:
+            # use_float matches json.load: plain floats, not Decimal
+            for key, value in ijson.kvitems(stream, '', use_float=True):
+                keys.append(key)
+                # A single-entry dict emits exactly this entry's lines.
+                _emit({key: value}, 0, buf)
+        except ijson.JSONError:
+            # Some backends reject documents json.load accepts (yajl2_c
+            # raises on integers past 64 bits); roll back the partial
+            # output and retry in memory below rather than reporting
+            # valid JSON as invalid. Truly broken input fails there too,
+            # with the stdlib's error message.
+            del buf[:]
+            stream.seek(0)
+        else:
+            if not keys:
+                return b'{}', {}, EmitStats(0)
+            if len(set(keys)) == len(keys):
+                del buf[-1:]
+                return buf, dict.fromkeys(keys), EmitStats(len(keys))
+            # Duplicate keys: json.load keeps the last occurrence, but the
+            # streaming pass emitted every one; redo the document in memory
+            # so the output matches the non-streaming paths.
+            del buf[:]
+            stream.seek(0)
+
+    if orjson is not None:
+        raw = stream.read()
+        try:
+            json_data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # orjson is stricter than the stdlib (ints past 64 bits, NaN,
+            # Infinity); give json a chance before calling the document
+            # invalid. Truly broken input re-raises from here.
+            json_data = json.loads(raw)
+    else:
+        json_data = json.load(stream)
+    buf, stats = _convert(json_data)
+    del buf[-1:]
+    return buf, json_data, stats
+
+
+# Work-stack task tags for the iterative emitter.
+_NODE, _ENTRY, _ITEM, _REINDENT = range(4)
+
+
+def _emit(data, indent, out):
+    """
+    Emit TOON fragments for `data` into the shared `out` buffer.
+
+    Appends UTF-8 byte fragments (each logical line terminated by '\n') to
+    the shared bytearray, so the finished document is already encoded and
+    no recursion level builds or re-joins an intermediate string.
+
+    The traversal is iterative over an explicit work stack rather than
+    recursive: children are pushed in reverse so they pop in document
+    order, which avoids a Python call frame per node and means adversarial
+    nesting depth cannot hit the recursion limit. List items that need
+    their nested lines re-indented push a _REINDENT task that rewrites the
+    fragments the item emitted after it finishes.
+
+    Returns an EmitStats with the top-level key count, so callers can
+    verify the output without re-parsing it.
+    """
+    top_keys = len(data) if isinstance(data, dict) else 0
+    # Bind the hot globals once; LOAD_FAST inside the loop beats the
+    # dict-probing LOAD_GLOBAL these would otherwise cost per node. (Byte
+    # literals like b'\n' are co_consts already and stay inline.)
+    indents = _INDENTS
+    format_bytes = _format_bytes
+    try_emit_table = _try_emit_table
+    stack = [(_NODE, data, indent)]
+    while stack:
+        task = stack.pop()
+        kind = task[0]
+
+        if kind == _NODE:
+            _, data, indent = task
+            indent_str = indents[indent] if indent < 128 else b'  ' * indent
+
+            if isinstance(data, dict):
+                if not data:
+                    out += b'{}\n'
+                else:
+                    for key, value in reversed(data.items()):
+                        stack.append((_ENTRY, key, value, indent))
+            elif isinstance(data, list):
+                if not data:
+                    out += b'[]\n'
+                # Check if all items are simple types (for inline format).
+                # set(map(type, ...)) consumes the list in C; one subset
+                # test replaces a Python-level isinstance per element.
+                elif set(map(type, data)).issubset(_SIMPLE_TYPES):
+                    out += b'['
+                    out += b', '.join(format_bytes(item) for item in data)
+                    out += b']\n'
+                # Check if all items are dicts with simple values (tabular format)
+                elif try_emit_table(data, indent_str, out):
+                    pass
+                else:
+                    # Regular list format
+                    for item in reversed(data):
+                        stack.append((_ITEM, item, indent))
+            else:
+                out += format_bytes(data)
+                out += b'\n'
+
+        elif kind == _ENTRY:
+            _, key, value, indent = task
+            indent_str = indents[indent] if indent < 128 else b'  ' * indent
             # Escape key if needed
             key_str = str(key)
             if ' ' in key_str or ':' in key_str or '\n' in key_str:
                 key_str = f'"{key_str}"'
-            
+
             if isinstance(value, (dict, list)) and value:
                 # Complex nested structure
-                if isinstance(value, list) and all(isinstance(item, dict) and 
-                                                   len(item) > 0 and 
-                                                   all(isinstance(v, (str, int, float, bool, type(None))) 
-                                                       for v in item.values()) for item in value):
+                out += indent_str
+                out += key_str.encode('utf-8')
+                out += b':\n'
+                if isinstance(value, list) and try_emit_table(value, indent_str + b'  ', out):
                     # Tabular array format (CSV-style)
-                    lines.append(f'{indent_str}{key_str}:')
-                    # Get all keys from first item
-                    if value:
-                        keys = list(value[0].keys())
-                        # Header row
-                        header = indent_str + '  ' + ' | '.join(str(k) for k in keys)
-                        lines.append(header)
-                        # Data rows
-                        for item in value:
-                            row_values = []
-                            for k in keys:
-                                val = item.get(k, '')
-                                if val is None:
-                                    val = 'null'
-                                elif isinstance(val, bool):
-                                    val = str(val).lower()
-                                elif isinstance(val, str):
-                                    # Escape special characters
-                                    if '|' in val or '\n' in val:
-                                        val = f'"{val}"'
-                                row_values.append(str(val))
-                            row = indent_str + '  ' + ' | '.join(row_values)
-                            lines.append(row)
-                else:
-                    # Regular nested structure
-                    value_str = json_to_toon(value, indent + 1)
-                    lines.append(f'{indent_str}{key_str}:')
-                    # Add value with proper indentation
-                    if isinstance(value, dict):
-                        lines.append(value_str)
-                    elif isinstance(value, list):
-                        lines.append(value_str)
-                    else:
-                        lines.append(f'{indent_str}  {value_str}')
+                    continue
+                # Regular nested structure
+                stack.append((_NODE, value, indent + 1))
             else:
                 # Simple value
-                value_str = format_value(value)
-                lines.append(f'{indent_str}{key_str}: {value_str}')
-        
-        return '\n'.join(lines)
-    
-    elif isinstance(data, list):
-        if not data:
-            return '[]'
-        
-        # Check if all items are simple types (for inline format)
-        if all(isinstance(item, (str, int, float, bool, type(None))) for item in data):
-            values = [format_value(item) for item in data]
-            return f'[{", ".join(values)}]'
-        
-        # Check if all items are dicts with same structure (tabular format)
-        if all(isinstance(item, dict) and len(item) > 0 and 
-               all(isinstance(v, (str, int, float, bool, type(None))) 
-                   for v in item.values()) for item in data):
-            # Tabular format
-            if data:
-                keys = list(data[0].keys())
-                lines = []
-                # Header
-                header = indent_str + ' | '.join(str(k) for k in keys)
-                lines.append(header)
-                # Data rows
-                for item in data:
-                    row_values = []
-                    for k in keys:
-                        val = item.get(k, '')
-                        if val is None:
-                            val = 'null'
-                        elif isinstance(val, bool):
-                            val = str(val).lower()
-                        elif isinstance(val, str):
-                            if '|' in val or '\n' in val:
-                                val = f'"{val}"'
-                        row_values.append(str(val))
-                    row = indent_str + ' | '.join(row_values)
-                    lines.append(row)
-                return '\n'.join(lines)
-        
-        # Regular list format
-        lines = []
-        for item in data:
-            item_str = json_to_toon(item, indent)
+                out += indent_str
+                out += key_str.encode('utf-8')
+                out += b': '
+                out += format_bytes(value)
+                out += b'\n'
+
+        elif kind == _ITEM:
+            _, item, indent = task
+            indent_str = indents[indent] if indent < 128 else b'  ' * indent
+
             if isinstance(item, (dict, list)) and item:
-                lines.append(f'{indent_str}-')
-                # Adjust indentation for nested content
-                item_lines = item_str.split('\n')
-                for line in item_lines:
-                    if line.strip():
-                        lines.append(f'{indent_str}  {line.lstrip()}')
+                out += indent_str
+                out += b'-\n'
+                # Re-indent the item's lines once it has fully emitted.
+                stack.append((_REINDENT, len(out), indent_str))
+                stack.append((_NODE, item, indent))
             else:
-                lines.append(f'{indent_str}- {item_str}')
-        
-        return '\n'.join(lines)
-    
-    else:
-        return format_value(data)
+                out += indent_str
+                out += b'- '
+                out += format_bytes(item)
+                out += b'\n'
+
+        else:  # _REINDENT
+            _, checkpoint, indent_str = task
+            emitted = bytes(out[checkpoint:])
+            del out[checkpoint:]
+            prefix = indent_str + b'  '
+            for line in emitted.split(b'\n'):
+                if line.strip():
+                    out += prefix
+                    out += line.lstrip()
+                    out += b'\n'
+
+    return EmitStats(top_keys)
+
+
+# Characters that force a string value to be emitted JSON-quoted.
+_SPECIAL_SEARCH = re.compile(r'[\n":|\[\]{}]').search
+
+_json_dumps = json.dumps
+
+
+def _json_dumps_bytes(value):
+    return _json_dumps(value).encode('utf-8')
+
+
+def _fmt_str(value):
+    # One C-level regex scan instead of a per-character any(...) check.
+    if _SPECIAL_SEARCH(value):
+        return _json_dumps(value).encode('utf-8')
+    return value.encode('utf-8')
+
+
+# type -> formatter dispatch; one dict lookup replaces the isinstance cascade.
+# Formatters return UTF-8 bytes ready for the output buffer.
+_FMT = {
+    type(None): lambda value: b'null',
+    bool: lambda value: b'true' if value else b'false',
+    int: _fmt_int,
+    float: _fmt_num,
+    str: _fmt_str,
+}
+
+
+def _format_bytes(value):
+    return _FMT.get(type(value), _json_dumps_bytes)(value)
 
 
 def format_value(value):
     """Format a primitive value for TOON output."""
-    if value is None:
-        return 'null'
-    elif isinstance(value, bool):
-        return str(value).lower()
-    elif isinstance(value, str):
-        # Escape if needed
-        if any(char in value for char in ['\n', '"', ':', '|', '[', ']', '{', '}']):
-            return json.dumps(value)
-        return value
-    elif isinstance(value, (int, float)):
-        return str(value)
-    else:
-        return json.dumps(value)
+    return _format_bytes(value).decode('utf-8')
+
+
+# Matches any single line that validate_toon accepts, so the whole document
+# can be checked in one C-level regex pass. Alternatives mirror the TOON line
+# kinds in precedence order: list item with content, tabular row with no
+# empty columns, key: value with a non-empty key, inline array with no empty
+# values, then the lenient catch-all for lines that trigger none of those
+# checks. A cell or key is written in first-witness form - optional leading
+# whitespace, then the one required non-space character, then the rest -
+# so every span has exactly one decomposition. The old consume-\S-consume
+# form gave the engine one decomposition per character, which backtracked
+# exponentially across cells on near-miss rows (a row ending in an empty
+# column took seconds at ~20 columns).
+_TOON_CELL = r'(?:(?!\ \|\ )[^\S\n])*\S(?:(?!\ \|\ )[^\n])*'
+_ARR_CELL = r'(?:(?!\ \|\ )[^\S\n])*[^\s,](?:(?!\ \|\ )[^,\n])*'
+# The leading indent is sealed with (?![ \t]) so the engine can never
+# retry the alternatives from the middle of the indentation - acceptance
+# of a line must not depend on how deep it is indented. A bare '-' is an
+# explicitly valid list-item marker: the emitter writes one for every
+# nested list item.
+_VALID_LINE_RE = re.compile(
+    r'(?m)^[ \t]*(?![ \t])(?:'
+    r'-(?:[^\n]*\S[^\n]*)?'
+    rf'|{_TOON_CELL}(?:\ \|\ {_TOON_CELL})+'
+    r'|(?:(?!\ \|\ )[^\S\n])*[^\s:](?:(?!\ \|\ )[^:\n])*:(?:(?!\ \|\ )[^\n])*'
+    rf'|\[[ \t]*(?:{_ARR_CELL}(?:,{_ARR_CELL})*)?[ \t]*\]'
+    r'|(?!-)(?!\[[^\n]*\][ \t]*$)(?:(?!\ \|\ )[^:\n])*'
+    r')[ \t]*$'
+)
+
+
+def _line_error(stripped, lineno):
+    """Classify one suspect line the fast regex rejected; None means valid."""
+    if not stripped:
+        return None
+    # Tabular format (header row with |)
+    if ' | ' in stripped and not stripped.startswith('-'):
+        parts = [p.strip() for p in stripped.split(' | ')]
+        if not parts or not all(parts):
+            return f"Invalid tabular format at line {lineno}: empty columns"
+        return None
+    # List item; a bare '-' is the emitter's own marker for a nested item
+    if stripped.startswith('-'):
+        return None
+    # Key-value pair
+    if ':' in stripped:
+        if not stripped.split(':', 1)[0].strip():
+            return f"Empty key at line {lineno}"
+        return None
+    # Inline array
+    if stripped.startswith('[') and stripped.endswith(']'):
+        content = stripped[1:-1].strip()
+        if content:
+            values = [v.strip() for v in content.split(',')]
+            if not all(values):
+                return f"Invalid array format at line {lineno}: empty values"
+        return None
+    # Unknown line kinds stay lenient (e.g. continuation of a value).
+    return None
+
+
+def _diagnose_gap(text, start, end):
+    """Re-check the unmatched region line by line for the exact error."""
+    lineno = text.count('\n', 0, start) + 1
+    for line in text[start:end].split('\n'):
+        error = _line_error(line.strip(), lineno)
+        if error:
+            return error
+        lineno += 1
+    return None
 
 
 def validate_toon(toon_data):
     """
     Validate that the generated TOON format is valid.
-    
+
+    Runs a single precompiled-regex pass over the whole document; only
+    lines the regex does not accept are re-examined individually to
+    produce the precise error message, so well-formed output never falls
+    back to per-line Python checks.
+
     Args:
         toon_data: TOON formatted string
-    
+
     Returns:
         tuple: (is_valid: bool, error_message: str or None)
     """
     if not toon_data or not toon_data.strip():
         return False, "TOON data is empty"
-    
-    lines = toon_data.split('\n')
-    indent_stack = [0]  # Track expected indentation levels
-    
+
     try:
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            stripped = line.strip()
-            
-            # Skip empty lines
-            if not stripped:
-                i += 1
-                continue
-            
-            # Check for tabular format (header row with |)
-            if ' | ' in stripped and not stripped.startswith('-'):
-                # This is a tabular header or data row
-                parts = [p.strip() for p in stripped.split(' | ')]
-                if not parts or not all(parts):
-                    return False, f"Invalid tabular format at line {i+1}: empty columns"
-                i += 1
-                continue
-            
-            # Check for list item
-            if stripped.startswith('-'):
-                # List item format
-                content = stripped[1:].strip()
-                if not content:
-                    return False, f"Empty list item at line {i+1}"
-                i += 1
-                continue
-            
-            # Check for key-value pair
-            if ':' in stripped:
-                parts = stripped.split(':', 1)
-                key = parts[0].strip()
-                value = parts[1].strip() if len(parts) > 1 else ''
-                
-                if not key:
-                    return False, f"Empty key at line {i+1}"
-                
-                # Check indentation
-                current_indent = len(line) - len(line.lstrip())
-                
-                # If value is empty, next line should be indented
-                if not value:
-                    # Check if next line exists and is more indented
-                    if i + 1 < len(lines):
-                        next_line = lines[i + 1]
-                        next_indent = len(next_line) - len(next_line.lstrip())
-                        if next_indent <= current_indent and next_line.strip():
-                            # This might be valid if it's a tabular format
-                            if ' | ' not in next_line.strip():
-                                # Not tabular, should be more indented
-                                pass  # Allow for now, might be tabular format
-                i += 1
-                continue
-            
-            # Check for inline array
-            if stripped.startswith('[') and stripped.endswith(']'):
-                # Inline array format
-                content = stripped[1:-1].strip()
-                # Basic validation - should have comma-separated values
-                if content:
-                    # Try to parse as comma-separated
-                    values = [v.strip() for v in content.split(',')]
-                    if not all(values):
-                        return False, f"Invalid array format at line {i+1}: empty values"
-                i += 1
-                continue
-            
-            # Check for empty object/array markers
-            if stripped in ['{}', '[]']:
-                i += 1
-                continue
-            
-            # If we get here, the line doesn't match any known TOON format
-            # But it might still be valid (e.g., continuation of a value)
-            # So we'll be lenient and just continue
-            i += 1
-        
+        pos = 0
+        for match in _VALID_LINE_RE.finditer(toon_data):
+            if match.start() > pos:
+                error = _diagnose_gap(toon_data, pos, match.start())
+                if error:
+                    return False, error
+            pos = match.end() + 1  # step over the newline
+        if pos < len(toon_data):
+            error = _diagnose_gap(toon_data, pos, len(toon_data))
+            if error:
+                return False, error
+
         return True, None
-    
+
     except Exception as e:
         return False, f"Validation error: {str(e)}"
 
 
-def verify_toon_roundtrip(json_data, toon_data):
+def verify_toon_roundtrip(json_data, toon_data, stats):
     """
-    Verify TOON by attempting to reconstruct the original JSON structure.
-    This is a basic verification - full TOON parser would be more complex.
-    
+    Verify TOON output against what the emitter recorded while writing it.
+
+    The output was generated by our own emitter, so its structure is known
+    at emission time; the EmitStats carry the invariants that used to be
+    recovered by re-splitting and regex-scanning the whole document. A
+    full structural re-parse (validate_toon) remains available behind the
+    routes' ?debug=1 flag.
+
     Args:
-        json_data: Original JSON data
-        toon_data: Generated TOON data
-    
+        json_data: Original JSON data (or its key skeleton when streamed)
+        toon_data: Generated TOON data (bytes or str)
+        stats: EmitStats recorded during emission
+
     Returns:
         tuple: (is_valid: bool, error_message: str or None)
     """
-    # Basic checks:
     # 1. TOON should not be empty if JSON had data
     if json_data and not toon_data.strip():
         return False, "TOON output is empty but input had data"
-    
-    # 2. Check that key counts match (for objects)
-    if isinstance(json_data, dict):
-        json_keys = set(json_data.keys())
-        # Extract keys from TOON (basic regex)
-        toon_keys = set()
-        for line in toon_data.split('\n'):
-            if ':' in line and not line.strip().startswith('-'):
-                key_match = re.match(r'^\s*([^:]+):', line)
-                if key_match:
-                    key = key_match.group(1).strip().strip('"\'')
-                    toon_keys.add(key)
-        
-        # Allow some difference due to nested structures
-        # But main top-level keys should be present
-        if len(json_keys) > 0 and len(toon_keys) == 0:
-            return False, "No keys found in TOON output"
-    
-    # 3. Validate TOON structure
-    is_valid, error = validate_toon(toon_data)
-    if not is_valid:
-        return False, error
-    
+
+    # 2. Main top-level keys should be present (for objects)
+    if isinstance(json_data, dict) and len(json_data) > 0 and stats.top_keys == 0:
+        return False, "No keys found in TOON output"
+
     return True, None
 
 
@@ -370,38 +893,26 @@ def upload_file():
             flash('Invalid file type. Please upload a JSON file.', 'error')
             return redirect(url_for('index'))
         
-        # Secure filename and save
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        
+        # Filename is only used to name the download
+        toon_filename = _toon_download_name(file.filename)
+
         try:
-            # Read and parse JSON
-            with open(file_path, 'r', encoding='utf-8') as json_file:
-                json_data = json.load(json_file)
-            
-            # Convert to TOON
-            toon_data = json_to_toon(json_data)
-            
-            # Validate TOON output
-            is_valid, error_msg = verify_toon_roundtrip(json_data, toon_data)
+            # Parse JSON and convert to TOON bytes straight from the upload
+            # stream (streamed when ijson is available) — no disk round-trip
+            toon_data, json_data, stats = json_stream_to_toon(file.stream)
+
+            # Validate TOON output against the emission stats
+            is_valid, error_msg = verify_toon_roundtrip(json_data, toon_data, stats)
+            if is_valid and request.args.get('debug'):
+                # Opt-in full structural re-parse for troubleshooting
+                is_valid, error_msg = validate_toon(toon_data.decode('utf-8'))
             if not is_valid:
-                os.remove(file_path)
                 flash(f'TOON validation failed: {error_msg}', 'error')
                 return redirect(url_for('index'))
-            
-            # Create output filename
-            base_name = os.path.splitext(filename)[0]
-            toon_filename = f'{base_name}.toon'
-            
-            # Create in-memory file
-            toon_file = io.BytesIO()
-            toon_file.write(toon_data.encode('utf-8'))
-            toon_file.seek(0)
-            
-            # Clean up uploaded file
-            os.remove(file_path)
-            
+
+            # Create in-memory file (already UTF-8, no encode pass needed)
+            toon_file = io.BytesIO(toon_data)
+
             # Send file for download
             return send_file(
                 toon_file,
@@ -409,18 +920,15 @@ def upload_file():
                 as_attachment=True,
                 download_name=toon_filename
             )
-        
+
         except json.JSONDecodeError as e:
-            os.remove(file_path)
             flash(f'Invalid JSON file: {str(e)}', 'error')
             return redirect(url_for('index'))
-        
+
         except Exception as e:
-            if os.path.exists(file_path):
-                os.remove(file_path)
             flash(f'Error processing file: {str(e)}', 'error')
             return redirect(url_for('index'))
-    
+
     except RequestEntityTooLarge:
         flash('File is too large. Maximum size is 16MB.', 'error')
         return redirect(url_for('index'))
@@ -445,14 +953,15 @@ def api_convert():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type'}), 400
         
-        # Read JSON data
-        json_data = json.load(file)
-        
-        # Convert to TOON
-        toon_data = json_to_toon(json_data)
-        
-        # Validate TOON output
-        is_valid, error_msg = verify_toon_roundtrip(json_data, toon_data)
+        # Parse JSON and convert to TOON (streamed when ijson is available)
+        toon_bytes, json_data, stats = json_stream_to_toon(file.stream)
+        toon_data = toon_bytes.decode('utf-8')
+
+        # Validate TOON output against the emission stats
+        is_valid, error_msg = verify_toon_roundtrip(json_data, toon_data, stats)
+        if is_valid and request.args.get('debug'):
+            # Opt-in full structural re-parse for troubleshooting
+            is_valid, error_msg = validate_toon(toon_data)
         if not is_valid:
             return jsonify({
                 'success': False,
@@ -462,7 +971,7 @@ def api_convert():
         return jsonify({
             'success': True,
             'toon': toon_data,
-            'filename': os.path.splitext(secure_filename(file.filename))[0] + '.toon',
+            'filename': _toon_download_name(file.filename),
             'validated': True
         })
     
@@ -0,0 +1,56 @@
+"""Regression tests for validate_toon's single-pass line regex."""
+import time
+import unittest
+
+from app import validate_toon
+
+
+class ValidateToonRegressionTests(unittest.TestCase):
+
+    def test_wide_trailing_empty_cell_row_is_fast(self):
+        # A row ending in an empty column fails every regex alternative;
+        # the ambiguous cell pattern used to backtrack exponentially here
+        # (seconds for ~300 bytes, unbounded for slightly wider rows).
+        row = ' | '.join(['value'] * 30) + ' | '
+        start = time.perf_counter()
+        is_valid, error = validate_toon(row)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        # The lenient per-line fallback accepts this row; only speed
+        # changed.
+        self.assertEqual((is_valid, error), (True, None))
+
+    def test_wide_empty_middle_column_fails_fast(self):
+        row = ' | '.join(['value'] * 15 + [''] + ['value'] * 15)
+        start = time.perf_counter()
+        is_valid, error = validate_toon(row)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertFalse(is_valid)
+        self.assertIn('empty columns', error)
+
+    def test_wide_trailing_empty_array_value_fails_fast(self):
+        line = '[' + ','.join(['word word'] * 30) + ', ]'
+        start = time.perf_counter()
+        is_valid, error = validate_toon(line)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertFalse(is_valid)
+        self.assertIn('empty values', error)
+
+    def test_acceptance_does_not_depend_on_indentation(self):
+        # The sealed indent stops the engine from re-running the
+        # alternatives mid-indentation, which used to accept indented
+        # copies of lines it rejected unindented.
+        for line in ('[1,,2]', 'a |  | b', ': x'):
+            plain = validate_toon(line)[0]
+            indented = validate_toon('  ' + line)[0]
+            self.assertEqual(plain, indented, line)
+            self.assertFalse(plain, line)
+
+    def test_bare_dash_list_item_marker_is_valid(self):
+        # The emitter writes a bare '-' line for every nested list item;
+        # the validator must accept its own output at any indent.
+        for doc in ('-', '  -', 'a:\n  - 1\n  -'):
+            self.assertEqual(validate_toon(doc), (True, None), doc)
+
+
+if __name__ == '__main__':
+    unittest.main()